@@ -2,13 +2,17 @@
 Configuration settings for Python ML Service
 """
 import os
-from typing import List, Optional
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from typing import FrozenSet, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """ML Service configuration settings."""
     
+    # Read-only once loaded so the cached instance can be shared safely
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, frozen=True)
+    
     # Service Configuration
     SERVICE_NAME: str = "digital-persona-ml-service"
     VERSION: str = "1.0.0"
@@ -30,6 +34,16 @@ class Settings(BaseSettings):
     OPENAI_VISION_MODEL: str = "gpt-4-vision-preview"
     OPENAI_MAX_TOKENS: int = 4000
     OPENAI_TEMPERATURE: float = 0.7
+    OPENAI_MAX_CONNECTIONS: int = 20
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    OPENAI_HTTP2: bool = True
+    PERSONALITY_CACHE_SIZE: int = 1024  # Analyses cached by text hash (0 disables)
+    PERSONALITY_CACHE_TTL: int = 3600  # seconds
+    PERSONALITY_MIN_TEXT_CHARS: int = 50  # Shorter texts are skipped without an API call
+    PERSONALITY_BATCH_MAX: int = 100  # Most texts accepted by one batch analysis request
+    EMBEDDING_CACHE_SIZE: int = 4096  # Vectors cached by text hash (0 disables)
+    EMBEDDING_CACHE_TTL: int = 86400  # seconds
     
     # AWS S3 Configuration
     AWS_ACCESS_KEY_ID: Optional[str] = None
@@ -54,8 +68,14 @@ class Settings(BaseSettings):
     AUDIO_OUTPUT_DIR: str = "./audio_output"
     
     # Computer Vision Configuration
-    CV_ANALYSIS_TYPES: List[str] = ["objects", "faces", "text", "emotions", "scene"]
+    CV_ANALYSIS_TYPES: FrozenSet[str] = frozenset({"objects", "faces", "text", "emotions", "scene"})
     MAX_IMAGE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    CV_RESULT_CACHE_SIZE: int = 256  # Analyses cached by image content hash (0 disables)
+    CV_RESULT_CACHE_TTL: int = 3600  # seconds
+    VISION_MAX_IMAGE_SIDE: int = 1024  # Larger images are downscaled before OpenAI Vision
+    VISION_JPEG_QUALITY: int = 85
+    CV_FACE_DETECTION_MAX_SIDE: int = 640  # Faces are searched on a copy this size (0 = full resolution)
+    CV_FACE_MIN_SIZE: int = 64  # Smallest face (original pixels) the downscale must keep detectable
     
     # Performance Configuration
     MAX_CONCURRENT_REQUESTS: int = 10
@@ -63,16 +83,16 @@ class Settings(BaseSettings):
     
     # File Processing Configuration
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
-    ALLOWED_IMAGE_TYPES: List[str] = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    ALLOWED_AUDIO_TYPES: List[str] = ["audio/mpeg", "audio/wav", "audio/ogg"]
+    ALLOWED_IMAGE_TYPES: FrozenSet[str] = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp"})
+    ALLOWED_AUDIO_TYPES: FrozenSet[str] = frozenset({"audio/mpeg", "audio/wav", "audio/ogg"})
     
     # CORS Configuration
-    ALLOWED_ORIGINS: List[str] = [
+    ALLOWED_ORIGINS: FrozenSet[str] = frozenset({
         "http://localhost:3000",
         "http://localhost:8000",
         "http://127.0.0.1:3000",
         "http://127.0.0.1:8000",
-    ]
+    })
     
     # Health Check Configuration
     HEALTH_CHECK_INTERVAL: int = 30  # seconds
@@ -104,16 +124,13 @@ class Settings(BaseSettings):
     def s3_available(self) -> bool:
         """Check if S3 is configured."""
         return bool(self.AWS_ACCESS_KEY_ID and self.AWS_SECRET_ACCESS_KEY and self.S3_BUCKET_NAME)
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get application settings, parsing the environment and .env only once."""
+    return Settings()
 
 
-def get_settings() -> Settings:
-    """Get application settings."""
-    return settings 
\ No newline at end of file
+# Global settings instance
+settings = get_settings() 
\ No newline at end of file
@@ -6,20 +6,22 @@ FastAPI application for AI and ML capabilities
 import os
 import sys
 import time
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+import orjson
 import uvicorn
 
 # Import configuration
 from app.config.settings import settings
 
-# Import routers
-from app.routers import health, openai_service, computer_vision, voice_synthesis, memory, personality_learning
+# Import core routers (optional capability routers are imported only when enabled)
+from app.routers import health, openai_service
 
 # Configure logging
 logging.basicConfig(
@@ -28,10 +30,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create necessary directories
-Path(settings.AUDIO_OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-Path(settings.CHROMA_DB_PATH).mkdir(parents=True, exist_ok=True)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -39,6 +37,20 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting {settings.SERVICE_NAME} v{settings.VERSION}")
     
+    # Create necessary directories
+    Path(settings.AUDIO_OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+    Path(settings.CHROMA_DB_PATH).mkdir(parents=True, exist_ok=True)
+    
+    # Build the OpenAI client up front so the first request doesn't pay for it
+    from app.services.openai_service import openai_service as openai_client
+    openai_client.initialize()
+    
+    # Refresh OpenAI status in the background so health probes read a snapshot
+    # instead of calling the API from the request path
+    status_refresher = asyncio.create_task(
+        openai_client.run_status_refresher(settings.HEALTH_CHECK_INTERVAL)
+    )
+    
     # Initialize ML models if enabled
     if settings.PRELOAD_MODELS:
         await initialize_ml_models()
@@ -47,6 +59,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down ML service")
+    status_refresher.cancel()
+    with suppress(asyncio.CancelledError):
+        await status_refresher
 
 
 async def initialize_ml_models():
@@ -71,7 +86,7 @@ async def initialize_ml_models():
 # Create FastAPI application
 app = FastAPI(
     title="Digital Persona ML Service",
-    description="""
+    description=f"""
     # 🤖 Digital Persona Platform - ML Service
     
     Microservice providing AI and ML capabilities for the Digital Persona Platform.
@@ -84,19 +99,15 @@ app = FastAPI(
     - 📚 **Personality Learning**: Adaptive persona traits from interactions
     
     ## Service Information
-    - **Version**: {version}
-    - **Environment**: {environment}
-    - **Port**: {port}
+    - **Version**: {settings.VERSION}
+    - **Environment**: {settings.ENVIRONMENT}
+    - **Port**: {settings.PORT}
     
     ## Health Checks
     - `/health` - Service health status
     - `/health/models` - ML model status
     - `/health/dependencies` - External service status
-    """.format(
-        version=settings.VERSION,
-        environment=settings.ENVIRONMENT,
-        port=settings.PORT
-    ),
+    """,
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
@@ -112,61 +123,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request/Response middleware
-@app.middleware("http")
-async def add_process_time_header(request, call_next):
-    """Add processing time to response headers."""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# Request/Response middleware (development only; production skips the extra
+# middleware layer on every request)
+if settings.is_development:
+    @app.middleware("http")
+    async def add_process_time_header(request, call_next):
+        """Add processing time to response headers."""
+        start_time = time.perf_counter_ns()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = f"{(time.perf_counter_ns() - start_time) * 1e-9:.6f}"
+        return response
 
 # Include routers
 app.include_router(health.router, prefix="/health", tags=["Health"])
 app.include_router(openai_service.router, prefix="/openai", tags=["OpenAI"])
 
-# Conditionally include AI capability routers
+# Conditionally include AI capability routers; disabled ones are never imported
 if settings.ENABLE_COMPUTER_VISION:
+    from app.routers import computer_vision
     app.include_router(computer_vision.router, prefix="/cv", tags=["Computer Vision"])
 
 if settings.ENABLE_VOICE_SYNTHESIS:
+    from app.routers import voice_synthesis
     app.include_router(voice_synthesis.router, prefix="/voice", tags=["Voice Synthesis"])
 
 if settings.ENABLE_MEMORY_SYSTEM:
+    from app.routers import memory
     app.include_router(memory.router, prefix="/memory", tags=["Memory"])
 
 if settings.ENABLE_PERSONALITY_LEARNING:
+    from app.routers import personality_learning
     app.include_router(personality_learning.router, prefix="/learning", tags=["Personality Learning"])
 
 
+# Root payload depends only on settings, which are fixed for the process
+ROOT_RESPONSE = orjson.dumps({
+    "service": settings.SERVICE_NAME,
+    "version": settings.VERSION,
+    "status": "healthy",
+    "environment": settings.ENVIRONMENT,
+    "capabilities": {
+        "openai": settings.openai_available,
+        "computer_vision": settings.ENABLE_COMPUTER_VISION,
+        "voice_synthesis": settings.ENABLE_VOICE_SYNTHESIS,
+        "memory_system": settings.ENABLE_MEMORY_SYSTEM,
+        "personality_learning": settings.ENABLE_PERSONALITY_LEARNING,
+        "s3_integration": settings.s3_available,
+    },
+    "endpoints": {
+        "docs": "/docs",
+        "health": "/health",
+        "openai": "/openai",
+        "computer_vision": "/cv",
+        "voice_synthesis": "/voice",
+        "memory": "/memory",
+        "personality_learning": "/learning",
+    }
+})
+
+
 # Root endpoint
 @app.get("/")
 async def root():
     """Service information and status."""
-    return {
-        "service": settings.SERVICE_NAME,
-        "version": settings.VERSION,
-        "status": "healthy",
-        "environment": settings.ENVIRONMENT,
-        "capabilities": {
-            "openai": settings.openai_available,
-            "computer_vision": settings.ENABLE_COMPUTER_VISION,
-            "voice_synthesis": settings.ENABLE_VOICE_SYNTHESIS,
-            "memory_system": settings.ENABLE_MEMORY_SYSTEM,
-            "personality_learning": settings.ENABLE_PERSONALITY_LEARNING,
-            "s3_integration": settings.s3_available,
-        },
-        "endpoints": {
-            "docs": "/docs",
-            "health": "/health",
-            "openai": "/openai",
-            "computer_vision": "/cv",
-            "voice_synthesis": "/voice",
-            "memory": "/memory",
-            "personality_learning": "/learning",
-        }
-    }
+    return Response(content=ROOT_RESPONSE, media_type="application/json")
 
 
 # Global exception handler
@@ -1,7 +1,2 @@
 # Routers package
-from . import health
-from . import openai_service  
-from . import computer_vision
-from . import voice_synthesis
-from . import memory
-from . import personality_learning
+# Submodules are imported by app.main only when their capability is enabled
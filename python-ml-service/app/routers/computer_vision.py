@@ -3,13 +3,35 @@ Computer Vision router for image analysis endpoints
 """
 import logging
 from typing import List, Dict, Any, Optional
+import orjson
 from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
 
+from app.config.settings import settings
+from app.utils.uploads import read_upload
+
+try:
+    from app.services.computer_vision_service import cv_service
+except ImportError:
+    # OpenCV/numpy not installed; endpoints report the service as unavailable
+    cv_service = None
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Capabilities depend only on settings, which are fixed for the process
+CAPABILITIES_RESPONSE = orjson.dumps({
+    "available_analysis_types": sorted(settings.CV_ANALYSIS_TYPES),
+    "max_image_size": settings.MAX_IMAGE_SIZE,
+    "enabled": settings.ENABLE_COMPUTER_VISION,
+    "engines": {
+        "openai_vision": True,
+        "opencv": True
+    }
+})
+
 
 # Pydantic models
 class ImageAnalysisRequest(BaseModel):
@@ -22,6 +44,7 @@ class ImageAnalysisResponse(BaseModel):
     results: Dict[str, Any]
     processing_time_ms: int
     models_used: str
+    tokens_used: int = Field(0, description="Total OpenAI tokens used by the analysis")
     image_info: Dict[str, Any]
 
 
@@ -29,22 +52,29 @@ class ImageAnalysisResponse(BaseModel):
 async def analyze_image(
     file: UploadFile = File(..., description="Image file to analyze"),
     analysis_types: str = Form(default="objects,faces,text,emotions", description="Comma-separated analysis types"),
-    use_openai: bool = Form(default=True, description="Whether to use OpenAI Vision API")
+    use_openai: bool = Form(default=True, description="Whether to use OpenAI Vision API"),
+    decode_scale: int = Form(default=1, description="Decode at 1/N resolution for OpenCV analysis (1, 2, 4 or 8)")
 ):
     """Analyze an image with multiple computer vision capabilities."""
     try:
+        if cv_service is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Computer vision service not available"
+            )
+        
         # Validate file type
-        if not file.content_type or not file.content_type.startswith('image/'):
+        if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be an image"
+                detail=f"File must be an image of type: {', '.join(sorted(settings.ALLOWED_IMAGE_TYPES))}"
             )
         
         # Parse analysis types
         analysis_types_list = [t.strip() for t in analysis_types.split(',') if t.strip()]
         
-        # Read image data
-        image_data = await file.read()
+        # Read image data, rejecting oversize uploads before copying them
+        image_data = await read_upload(file, settings.MAX_IMAGE_SIZE)
         
         if len(image_data) == 0:
             raise HTTPException(
@@ -52,23 +82,15 @@ async def analyze_image(
                 detail="Empty image file"
             )
         
-        # Import and use computer vision service
-        try:
-            from app.services.computer_vision_service import cv_service
-            
-            result = await cv_service.analyze_image(
-                image_data=image_data,
-                analysis_types=analysis_types_list,
-                use_openai=use_openai
-            )
-            
-            return ImageAnalysisResponse(**result)
-            
-        except ImportError:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Computer vision service not available"
-            )
+        result = await cv_service.analyze_image(
+            image_data=image_data,
+            analysis_types=analysis_types_list,
+            use_openai=use_openai,
+            decode_scale=decode_scale
+        )
+        
+        # Service results are already typed; skip re-validation
+        return ImageAnalysisResponse.model_construct(**result)
         
     except HTTPException:
         raise
@@ -83,15 +105,15 @@ async def analyze_image(
 @router.get("/status")
 async def get_cv_status():
     """Get computer vision service status."""
-    try:
-        from app.services.computer_vision_service import cv_service
-        return cv_service.get_service_status()
-        
-    except ImportError:
+    if cv_service is None:
         return {
             "status": "not_available",
             "message": "Computer vision service not available"
         }
+    
+    try:
+        return cv_service.get_service_status()
+        
     except Exception as e:
         logger.error(f"Failed to get CV status: {e}")
         raise HTTPException(
@@ -103,22 +125,4 @@ async def get_cv_status():
 @router.get("/capabilities")
 async def get_cv_capabilities():
     """Get available computer vision capabilities."""
-    try:
-        from app.config.settings import settings
-        
-        return {
-            "available_analysis_types": settings.CV_ANALYSIS_TYPES,
-            "max_image_size": settings.MAX_IMAGE_SIZE,
-            "enabled": settings.ENABLE_COMPUTER_VISION,
-            "engines": {
-                "openai_vision": True,
-                "opencv": True
-            }
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to get CV capabilities: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to get capabilities: {str(e)}"
-        ) 
\ No newline at end of file
+    return Response(content=CAPABILITIES_RESPONSE, media_type="application/json")
\ No newline at end of file
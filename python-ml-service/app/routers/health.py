@@ -9,21 +9,31 @@ from fastapi import APIRouter, HTTPException, status
 from app.config.settings import settings
 from app.services.openai_service import openai_service
 
+# Resolved once at import; None when computer vision is disabled or OpenCV is missing
+cv_service = None
+if settings.ENABLE_COMPUTER_VISION:
+    try:
+        from app.services.computer_vision_service import cv_service
+    except ImportError:
+        pass
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Static part of the basic health payload; only the timestamp changes per call
+HEALTH_INFO = {
+    "status": "healthy",
+    "service": settings.SERVICE_NAME,
+    "version": settings.VERSION,
+    "environment": settings.ENVIRONMENT
+}
+
 
 @router.get("/")
 async def health_check() -> Dict[str, Any]:
     """Basic health check endpoint."""
-    return {
-        "status": "healthy",
-        "service": settings.SERVICE_NAME,
-        "version": settings.VERSION,
-        "environment": settings.ENVIRONMENT,
-        "timestamp": time.time()
-    }
+    return {**HEALTH_INFO, "timestamp": time.time()}
 
 
 @router.get("/detailed")
@@ -54,10 +64,9 @@ async def detailed_health_check() -> Dict[str, Any]:
         
         # Add computer vision status if enabled
         if settings.ENABLE_COMPUTER_VISION:
-            try:
-                from app.services.computer_vision_service import cv_service
+            if cv_service is not None:
                 health_status["dependencies"]["computer_vision"] = cv_service.get_service_status()
-            except ImportError:
+            else:
                 health_status["dependencies"]["computer_vision"] = {"status": "not_available"}
         
         return health_status
@@ -83,13 +92,12 @@ async def models_health_check() -> Dict[str, Any]:
         
         # Add computer vision models if enabled
         if settings.ENABLE_COMPUTER_VISION:
-            try:
-                from app.services.computer_vision_service import cv_service
+            if cv_service is not None:
                 models_status["computer_vision"] = {
                     "loaded": cv_service.models_loaded,
                     "opencv_available": True
                 }
-            except ImportError:
+            else:
                 models_status["computer_vision"] = {
                     "loaded": False,
                     "opencv_available": False
@@ -2,18 +2,25 @@
 Memory Service router (placeholder)
 """
 import logging
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.utils.responses import conditional_json_response, make_etag
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Placeholder payload is constant; serialize it once at import
+STATUS_RESPONSE = orjson.dumps({
+    "status": "not_implemented",
+    "message": "Memory service is a placeholder - to be implemented",
+    "features": ["vector_embeddings", "chroma_db", "semantic_search"]
+})
+STATUS_ETAG = make_etag(STATUS_RESPONSE)
+
 
 @router.get("/status")
-async def get_memory_status():
+async def get_memory_status(request: Request):
     """Get memory service status."""
-    return {
-        "status": "not_implemented",
-        "message": "Memory service is a placeholder - to be implemented",
-        "features": ["vector_embeddings", "chroma_db", "semantic_search"]
-    } 
\ No newline at end of file
+    return conditional_json_response(request, STATUS_RESPONSE, STATUS_ETAG)
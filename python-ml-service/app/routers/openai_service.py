@@ -2,21 +2,44 @@
 OpenAI router for AI processing endpoints
 """
 import logging
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from typing import List, Dict, Any, Iterator, Optional
+import numpy as np
+import orjson
+from fastapi import APIRouter, HTTPException, Request, status, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from typing_extensions import Annotated, TypedDict
 
+from app.config.settings import settings
 from app.services.openai_service import openai_service
+from app.utils.responses import conditional_json_response, make_etag
+from app.utils.uploads import read_upload
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Static model catalogue served by /models
+CHAT_MODELS = ("gpt-4-turbo-preview", "gpt-4", "gpt-3.5-turbo")
+VISION_MODELS = ("gpt-4-vision-preview",)
+EMBEDDING_MODELS = ("text-embedding-ada-002", "text-embedding-3-small", "text-embedding-3-large")
+
+# Model catalogue depends only on settings, which are fixed for the process
+MODELS_RESPONSE = orjson.dumps({
+    "chat_models": CHAT_MODELS,
+    "vision_models": VISION_MODELS,
+    "embedding_models": EMBEDDING_MODELS,
+    "default_chat_model": openai_service.default_model,
+    "default_vision_model": openai_service.vision_model
+})
+MODELS_ETAG = make_etag(MODELS_RESPONSE)
+
 
 # Pydantic models
-class ChatMessage(BaseModel):
-    role: str = Field(..., description="Message role: 'user', 'assistant', or 'system'")
-    content: str = Field(..., description="Message content")
+# Validated straight into the plain dicts the OpenAI client takes
+class ChatMessage(TypedDict):
+    role: Annotated[str, Field(description="Message role: 'user', 'assistant', or 'system'")]
+    content: Annotated[str, Field(description="Message content")]
 
 
 class ChatCompletionRequest(BaseModel):
@@ -55,6 +78,22 @@ class PersonalityAnalysisResponse(BaseModel):
     analysis: str
     model_used: str
     tokens_used: Optional[int]
+    skipped: Optional[str] = Field(None, description="Set (e.g. 'text_too_short') when no analysis was run")
+
+
+class BatchPersonalityAnalysisRequest(BaseModel):
+    texts: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.PERSONALITY_BATCH_MAX,
+        description="Texts to analyze"
+    )
+    analysis_prompt: str = Field(..., description="Analysis instructions applied to every text")
+    model: Optional[str] = Field(None, description="Model to use")
+
+
+class BatchPersonalityAnalysisResponse(BaseModel):
+    results: List[Dict[str, Any]]
 
 
 class EmbeddingRequest(BaseModel):
@@ -73,17 +112,15 @@ class EmbeddingResponse(BaseModel):
 async def generate_chat_completion(request: ChatCompletionRequest):
     """Generate a chat completion using OpenAI."""
     try:
-        # Convert Pydantic models to dict format expected by OpenAI service
-        messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
-        
         result = await openai_service.generate_chat_completion(
-            messages=messages,
+            messages=request.messages,
             model=request.model,
             max_tokens=request.max_tokens,
             temperature=request.temperature
         )
         
-        return ChatCompletionResponse(**result)
+        # Service results are already typed; skip re-validation
+        return ChatCompletionResponse.model_construct(**result)
         
     except HTTPException:
         raise
@@ -95,6 +132,46 @@ async def generate_chat_completion(request: ChatCompletionRequest):
         )
 
 
+@router.post("/chat/completions/stream")
+async def stream_chat_completion(request: ChatCompletionRequest):
+    """Stream a chat completion as server-sent events."""
+    try:
+        stream = await openai_service.stream_chat_completion(
+            messages=request.messages,
+            model=request.model,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Chat completion stream failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Chat completion failed: {str(e)}"
+        )
+    
+    def event_stream() -> Iterator[bytes]:
+        # Sync generator: Starlette iterates it in the threadpool, so the
+        # blocking OpenAI stream never stalls the event loop
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    yield b"data: " + orjson.dumps({"content": choice.delta.content}) + b"\n\n"
+                if choice.finish_reason:
+                    yield b"data: " + orjson.dumps({"finish_reason": choice.finish_reason}) + b"\n\n"
+        except Exception as e:
+            logger.error(f"Chat completion stream interrupted: {e}")
+            yield b"data: " + orjson.dumps({"error": str(e)}) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.post("/vision/analyze", response_model=ImageAnalysisResponse)
 async def analyze_image(
     file: UploadFile = File(..., description="Image file to analyze"),
@@ -110,8 +187,8 @@ async def analyze_image(
                 detail="File must be an image"
             )
         
-        # Read image data
-        image_data = await file.read()
+        # Read image data, rejecting oversize uploads before copying them
+        image_data = await read_upload(file, settings.MAX_IMAGE_SIZE)
         
         if len(image_data) == 0:
             raise HTTPException(
@@ -125,7 +202,8 @@ async def analyze_image(
             model=model
         )
         
-        return ImageAnalysisResponse(**result)
+        # Service results are already typed; skip re-validation
+        return ImageAnalysisResponse.model_construct(**result)
         
     except HTTPException:
         raise
@@ -147,7 +225,8 @@ async def analyze_personality(request: PersonalityAnalysisRequest):
             model=request.model
         )
         
-        return PersonalityAnalysisResponse(**result)
+        # Service results are already typed; skip re-validation
+        return PersonalityAnalysisResponse.model_construct(**result)
         
     except HTTPException:
         raise
@@ -159,6 +238,29 @@ async def analyze_personality(request: PersonalityAnalysisRequest):
         )
 
 
+@router.post("/text/personality-analysis/batch", response_model=BatchPersonalityAnalysisResponse)
+async def analyze_personality_batch(request: BatchPersonalityAnalysisRequest):
+    """Analyze several texts for personality traits concurrently."""
+    try:
+        results = await openai_service.analyze_texts_for_personality(
+            texts=request.texts,
+            analysis_prompt=request.analysis_prompt,
+            model=request.model
+        )
+        
+        # Results come back in request order; failed texts carry an "error" key
+        return BatchPersonalityAnalysisResponse.model_construct(results=results)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch personality analysis failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch personality analysis failed: {str(e)}"
+        )
+
+
 @router.post("/embeddings", response_model=EmbeddingResponse)
 async def generate_embeddings(request: EmbeddingRequest):
     """Generate text embeddings using OpenAI."""
@@ -168,7 +270,54 @@ async def generate_embeddings(request: EmbeddingRequest):
             model=request.model
         )
         
-        return EmbeddingResponse(**result)
+        # Returning a Response bypasses FastAPI's response_model validation and
+        # encoding, which walks every float of every vector. orjson serializes
+        # the service's numpy vectors natively. The declared response_model
+        # still documents the payload shape.
+        return Response(
+            content=orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY),
+            media_type="application/json"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Embedding generation failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Embedding generation failed: {str(e)}"
+        )
+
+
+@router.post(
+    "/embeddings/binary",
+    response_class=Response,
+    responses={200: {"content": {"application/octet-stream": {}}}}
+)
+async def generate_embeddings_binary(request: EmbeddingRequest):
+    """Generate text embeddings as a packed little-endian float16 matrix.
+    
+    The body is row-major with the shape in X-Shape; decode it with
+    np.frombuffer(body, dtype="<f2").reshape(rows, dims).
+    """
+    try:
+        result = await openai_service.generate_text_embeddings(
+            texts=request.texts,
+            model=request.model
+        )
+        
+        vectors = result["embeddings"]
+        matrix = np.asarray(vectors, dtype="<f2").reshape(len(vectors), -1 if vectors else 0)
+        return Response(
+            content=matrix.tobytes(),
+            media_type="application/octet-stream",
+            headers={
+                "X-Shape": f"{matrix.shape[0]},{matrix.shape[1]}",
+                "X-Dtype": "float16",
+                "X-Model-Used": result["model_used"],
+                "X-Tokens-Used": str(result["tokens_used"] or 0),
+            }
+        )
         
     except HTTPException:
         raise
@@ -181,10 +330,12 @@ async def generate_embeddings(request: EmbeddingRequest):
 
 
 @router.get("/status")
-async def get_openai_status():
+async def get_openai_status(request: Request):
     """Get OpenAI service status and configuration."""
     try:
-        return {
+        # Status only changes when the background refresher swaps the snapshot,
+        # so conditional requests from pollers usually end in a bodyless 304
+        body = orjson.dumps({
             "available": openai_service.is_available(),
             "status": openai_service.get_api_status(),
             "models": {
@@ -196,7 +347,8 @@ async def get_openai_status():
                 "temperature": openai_service.temperature,
                 "max_retries": openai_service.max_retries
             }
-        }
+        })
+        return conditional_json_response(request, body)
         
     except Exception as e:
         logger.error(f"Failed to get OpenAI status: {e}")
@@ -207,7 +359,7 @@ async def get_openai_status():
 
 
 @router.get("/models")
-async def list_available_models():
+async def list_available_models(request: Request):
     """List available OpenAI models."""
     try:
         if not openai_service.is_available():
@@ -216,23 +368,7 @@ async def list_available_models():
                 detail="OpenAI service not available"
             )
         
-        return {
-            "chat_models": [
-                "gpt-4-turbo-preview",
-                "gpt-4",
-                "gpt-3.5-turbo"
-            ],
-            "vision_models": [
-                "gpt-4-vision-preview"
-            ],
-            "embedding_models": [
-                "text-embedding-ada-002",
-                "text-embedding-3-small",
-                "text-embedding-3-large"
-            ],
-            "default_chat_model": openai_service.default_model,
-            "default_vision_model": openai_service.vision_model
-        }
+        return conditional_json_response(request, MODELS_RESPONSE, MODELS_ETAG)
         
     except HTTPException:
         raise
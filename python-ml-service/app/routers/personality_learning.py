@@ -2,18 +2,25 @@
 Personality Learning router (placeholder)
 """
 import logging
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.utils.responses import conditional_json_response, make_etag
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Placeholder payload is constant; serialize it once at import
+STATUS_RESPONSE = orjson.dumps({
+    "status": "not_implemented",
+    "message": "Personality learning service is a placeholder - to be implemented",
+    "features": ["conversation_analysis", "trait_extraction", "personality_adaptation"]
+})
+STATUS_ETAG = make_etag(STATUS_RESPONSE)
+
 
 @router.get("/status")
-async def get_learning_status():
+async def get_learning_status(request: Request):
     """Get personality learning service status."""
-    return {
-        "status": "not_implemented",
-        "message": "Personality learning service is a placeholder - to be implemented",
-        "features": ["conversation_analysis", "trait_extraction", "personality_adaptation"]
-    } 
\ No newline at end of file
+    return conditional_json_response(request, STATUS_RESPONSE, STATUS_ETAG)
@@ -2,27 +2,37 @@
 Voice Synthesis router (placeholder)
 """
 import logging
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import Response
+
+from app.utils.responses import conditional_json_response, make_etag
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Placeholder payloads are constant; serialize them once at import
+STATUS_RESPONSE = orjson.dumps({
+    "status": "not_implemented",
+    "message": "Voice synthesis service is a placeholder - to be implemented"
+})
+STATUS_ETAG = make_etag(STATUS_RESPONSE)
+
+ENGINES_RESPONSE = orjson.dumps({
+    "available_engines": ["edge", "gtts"],
+    "default_engine": "edge",
+    "status": "not_implemented"
+})
+
 
 @router.get("/status")
-async def get_voice_status():
+async def get_voice_status(request: Request):
     """Get voice synthesis service status."""
-    return {
-        "status": "not_implemented",
-        "message": "Voice synthesis service is a placeholder - to be implemented"
-    }
+    return conditional_json_response(request, STATUS_RESPONSE, STATUS_ETAG)
 
 
 @router.get("/engines")
 async def get_voice_engines():
     """Get available voice synthesis engines."""
-    return {
-        "available_engines": ["edge", "gtts"],
-        "default_engine": "edge",
-        "status": "not_implemented"
-    } 
\ No newline at end of file
+    return Response(content=ENGINES_RESPONSE, media_type="application/json")
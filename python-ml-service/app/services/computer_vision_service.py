@@ -1,24 +1,100 @@
 """
 Computer Vision Service for image analysis capabilities
 """
-import os
 import time
+import asyncio
 import logging
-import json
+import io
 import base64
-from typing import Dict, List, Any, Optional
+import hashlib
+import threading
+from typing import Dict, List, Any, Literal, Optional, Sequence, Tuple
 from pathlib import Path
 import cv2
 import numpy as np
 from PIL import Image
+import orjson
 from fastapi import HTTPException, status
 
 from app.config.settings import settings
 from app.services.openai_service import openai_service
+from app.utils.cache import LRUCache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# OpenAI Vision analyses: type -> (result key, log label, prompt)
+VISION_ANALYSES = {
+    'objects': (
+        "objects_description",
+        "object detection",
+        "Describe all objects, people, animals, and items visible in this image. Include their positions and any notable details. Format as a detailed list."
+    ),
+    'faces': (
+        "faces_analysis",
+        "face detection",
+        "Count and describe all faces visible in this image. Include their positions, expressions, estimated age ranges, and any notable features. If no faces are visible, state that clearly."
+    ),
+    'text': (
+        "extracted_text",
+        "text extraction",
+        "Extract and list all text visible in this image. Include any signs, labels, handwritten text, or printed content. If no text is visible, state that clearly."
+    ),
+    'emotions': (
+        "emotion_analysis",
+        "emotion analysis",
+        "Analyze the emotions and mood visible in this image. Look at facial expressions, body language, and overall atmosphere. Describe the emotions you can detect and their intensity."
+    ),
+    'scene': (
+        "scene_description",
+        "scene analysis",
+        "Describe the overall scene, setting, and context of this image. Include location type, time of day, weather conditions, and any notable environmental factors."
+    ),
+}
+
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION_TAG = 0x0112
+
+# Smallest face the Haar cascades can find, in pixels of the searched image
+HAAR_WINDOW_SIZE = 24
+
+# Analyses run when the caller doesn't pick any
+DEFAULT_ANALYSIS_TYPES = ('objects', 'faces', 'text', 'emotions')
+
+# OpenCV analyses that work on the grayscale image (converted once per request)
+GRAYSCALE_ANALYSES = frozenset({'objects', 'faces'})
+
+# Haar cascades bundled with opencv-python
+FACE_CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+EYE_CASCADE_FILE = 'haarcascade_eye.xml'
+
+# imdecode flags per decode scale; JPEG is downscaled inside the IDCT, so a
+# reduced decode is cheaper than decoding full size and resizing
+DecodeScale = Literal[1, 2, 4, 8]
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+# CascadeClassifier keeps scratch state between detectMultiScale calls, so one
+# instance can't be shared by the analysis worker threads
+_thread_cascades = threading.local()
+
+
+def load_cascade(filename: str) -> Optional[cv2.CascadeClassifier]:
+    """Parse a bundled Haar cascade once per thread; None if it can't be loaded."""
+    cascades = getattr(_thread_cascades, 'by_file', None)
+    if cascades is None:
+        cascades = _thread_cascades.by_file = {}
+    
+    if filename not in cascades:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + filename)
+        cascades[filename] = None if cascade.empty() else cascade
+    return cascades[filename]
+
 
 class ComputerVisionService:
     """Service for computer vision and image analysis capabilities."""
@@ -27,10 +103,33 @@ class ComputerVisionService:
         self.models_loaded = False
         self.available_analysis_types = settings.CV_ANALYSIS_TYPES
         self.max_image_size = settings.MAX_IMAGE_SIZE
+        self.vision_max_side = settings.VISION_MAX_IMAGE_SIDE
+        self.vision_jpeg_quality = settings.VISION_JPEG_QUALITY
+        self.face_detection_max_side = settings.CV_FACE_DETECTION_MAX_SIDE
+        self.face_min_size = settings.CV_FACE_MIN_SIZE
+        
+        # Analysis results keyed by image content hash, requested types and engine
+        self._result_cache = LRUCache(maxsize=settings.CV_RESULT_CACHE_SIZE, ttl=settings.CV_RESULT_CACHE_TTL)
         
         # OpenCV and traditional CV models (to be loaded on demand)
         self.face_cascade = None
         self.eye_cascade = None
+        
+        # Analysis handlers per engine, keyed by analysis type
+        self._openai_analyzers = {
+            'objects': self._detect_objects_openai,
+            'faces': self._detect_faces_openai,
+            'text': self._extract_text_openai,
+            'emotions': self._analyze_emotions_openai,
+            'scene': self._analyze_scene_openai,
+        }
+        self._opencv_analyzers = {
+            'objects': self._detect_objects_opencv,
+            'faces': self._detect_faces_opencv,
+            'text': self._extract_text_opencv,
+            'emotions': self._analyze_emotions_opencv,
+            'scene': self._analyze_scene_opencv,
+        }
     
     async def initialize(self):
         """Initialize computer vision models."""
@@ -51,15 +150,13 @@ class ComputerVisionService:
         """Load OpenCV pre-trained models."""
         try:
             # Load face detection cascade
-            face_cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            if os.path.exists(face_cascade_path):
-                self.face_cascade = cv2.CascadeClassifier(face_cascade_path)
+            self.face_cascade = load_cascade(FACE_CASCADE_FILE)
+            if self.face_cascade is not None:
                 logger.info("Face detection model loaded")
             
             # Load eye detection cascade
-            eye_cascade_path = cv2.data.haarcascades + 'haarcascade_eye.xml'
-            if os.path.exists(eye_cascade_path):
-                self.eye_cascade = cv2.CascadeClassifier(eye_cascade_path)
+            self.eye_cascade = load_cascade(EYE_CASCADE_FILE)
+            if self.eye_cascade is not None:
                 logger.info("Eye detection model loaded")
                 
         except Exception as e:
@@ -68,23 +165,36 @@ class ComputerVisionService:
     async def analyze_image(
         self, 
         image_data: bytes,
-        analysis_types: Optional[List[str]] = None,
-        use_openai: bool = True
+        analysis_types: Optional[Sequence[str]] = None,
+        use_openai: bool = True,
+        decode_scale: DecodeScale = 1
     ) -> Dict[str, Any]:
-        """Analyze an image with multiple AI capabilities."""
+        """Analyze an image with multiple AI capabilities.
+        
+        decode_scale > 1 decodes at 1/decode_scale resolution for the OpenCV
+        analyses; reported sizes and positions stay in original-image pixels.
+        """
+        
+        if decode_scale not in DECODE_FLAGS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid decode_scale: {decode_scale}. Available: {sorted(DECODE_FLAGS)}"
+            )
         
         if analysis_types is None:
-            analysis_types = ['objects', 'faces', 'text', 'emotions']
+            analysis_types = DEFAULT_ANALYSIS_TYPES
+        else:
+            # Repeated types would only repeat work (and paid vision prompts)
+            analysis_types = list(dict.fromkeys(analysis_types))
         
-        # Validate analysis types
+        # Validate analysis types (available_analysis_types is a frozenset)
         invalid_types = [t for t in analysis_types if t not in self.available_analysis_types]
         if invalid_types:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid analysis types: {invalid_types}. Available: {self.available_analysis_types}"
+                detail=f"Invalid analysis types: {invalid_types}. Available: {sorted(self.available_analysis_types)}"
             )
         
-        results = {}
         start_time = time.time()
         
         try:
@@ -95,9 +205,21 @@ class ComputerVisionService:
                     detail=f"Image size exceeds maximum allowed size of {self.max_image_size} bytes"
                 )
             
+            use_openai_vision = use_openai and openai_service.is_available()
+            
+            # OpenAI Vision gets its own resize from the full image
+            if use_openai_vision:
+                decode_scale = 1
+            
+            # Identical image + analysis request: reuse the stored analysis
+            cache_key = (hashlib.sha256(image_data).digest(), tuple(analysis_types), use_openai_vision, decode_scale)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                return {**cached, 'processing_time_ms': int((time.time() - start_time) * 1000)}
+            
             # Convert bytes to image format for OpenCV processing
             image_array = np.frombuffer(image_data, np.uint8)
-            cv_image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+            cv_image = await asyncio.to_thread(cv2.imdecode, image_array, DECODE_FLAGS[decode_scale])
             
             if cv_image is None:
                 raise HTTPException(
@@ -105,51 +227,55 @@ class ComputerVisionService:
                     detail="Invalid image format"
                 )
             
-            # Perform different types of analysis
-            for analysis_type in analysis_types:
-                if analysis_type == 'objects':
-                    if use_openai and openai_service.is_available():
-                        results['objects'] = await self._detect_objects_openai(image_data)
-                    else:
-                        results['objects'] = await self._detect_objects_opencv(cv_image)
-                        
-                elif analysis_type == 'faces':
-                    if use_openai and openai_service.is_available():
-                        results['faces'] = await self._detect_faces_openai(image_data)
-                    else:
-                        results['faces'] = await self._detect_faces_opencv(cv_image)
-                        
-                elif analysis_type == 'text':
-                    if use_openai and openai_service.is_available():
-                        results['text'] = await self._extract_text_openai(image_data)
-                    else:
-                        results['text'] = await self._extract_text_opencv(cv_image)
-                        
-                elif analysis_type == 'emotions':
-                    if use_openai and openai_service.is_available():
-                        results['emotions'] = await self._analyze_emotions_openai(image_data)
-                    else:
-                        results['emotions'] = {"message": "Emotion analysis requires OpenAI"}
-                        
-                elif analysis_type == 'scene':
-                    if use_openai and openai_service.is_available():
-                        results['scene'] = await self._analyze_scene_openai(image_data)
-                    else:
-                        results['scene'] = await self._analyze_scene_opencv(cv_image)
-            
-            processing_time_ms = int((time.time() - start_time) * 1000)
+            # A reduced decode rounds the size up, so read the real one from the header
+            if decode_scale == 1:
+                height, width = cv_image.shape[:2]
+            else:
+                width, height = self._read_image_size(image_data)
             
-            return {
+            if use_openai_vision:
+                # Downscale and base64-encode once for the vision request: fewer upload
+                # bytes and image tokens, and every request below shares the one string
+                image_b64 = await asyncio.to_thread(self._prepare_for_vision, cv_image, image_data)
+                
+                # The decoded bitmap is the largest buffer held here; release it before
+                # the network wait rather than when the request completes
+                del cv_image
+                
+                # One multi-aspect request instead of one upload per analysis type
+                results, tokens_used = await self._analyze_all_openai(image_b64, analysis_types)
+            else:
+                gray = None
+                if GRAYSCALE_ANALYSES.intersection(analysis_types):
+                    gray = await asyncio.to_thread(cv2.cvtColor, cv_image, cv2.COLOR_BGR2GRAY)
+                
+                # OpenCV releases the GIL, so the independent analyses run in
+                # parallel on worker threads instead of blocking the event loop
+                jobs = [
+                    asyncio.to_thread(self._opencv_analyzers[t], cv_image, gray, (width, height))
+                    for t in analysis_types
+                ]
+                results = dict(zip(analysis_types, await asyncio.gather(*jobs)))
+                tokens_used = 0
+            
+            analysis = {
                 'analysis_types': analysis_types,
                 'results': results,
-                'processing_time_ms': processing_time_ms,
-                'models_used': 'openai' if use_openai and openai_service.is_available() else 'opencv',
+                'models_used': 'openai' if use_openai_vision else 'opencv',
+                'tokens_used': tokens_used,
                 'image_info': {
                     'size_bytes': len(image_data),
-                    'dimensions': f"{cv_image.shape[1]}x{cv_image.shape[0]}" if cv_image is not None else "unknown"
+                    'dimensions': f"{width}x{height}",
+                    'decode_scale': decode_scale
                 }
             }
             
+            # Don't pin transient failures in the cache
+            if not any('error' in result for result in results.values()):
+                self._result_cache.set(cache_key, analysis)
+            
+            return {**analysis, 'processing_time_ms': int((time.time() - start_time) * 1000)}
+            
         except Exception as e:
             logger.error(f"Image analysis failed: {e}")
             raise HTTPException(
@@ -157,108 +283,137 @@ class ComputerVisionService:
                 detail=f"Image analysis failed: {str(e)}"
             )
     
+    @staticmethod
+    def _read_image_size(image_data: bytes) -> Tuple[int, int]:
+        """(width, height) as cv2.imdecode orients the image, without decoding pixels."""
+        with Image.open(io.BytesIO(image_data)) as image:
+            width, height = image.size
+            # imdecode applies the EXIF orientation; 5-8 are the transposed ones
+            if image.getexif().get(EXIF_ORIENTATION_TAG) in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height
+    
     # OpenAI-based analysis methods
-    async def _detect_objects_openai(self, image_data: bytes) -> Dict[str, Any]:
-        """Detect objects using OpenAI Vision API."""
+    def _prepare_for_vision(self, cv_image: np.ndarray, image_data: bytes) -> str:
+        """Base64 payload for OpenAI Vision; images larger than vision_max_side are shrunk to a JPEG."""
+        height, width = cv_image.shape[:2]
+        scale = self.vision_max_side / max(height, width)
+        if scale < 1.0:
+            resized = cv2.resize(cv_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode('.jpg', resized, [cv2.IMWRITE_JPEG_QUALITY, self.vision_jpeg_quality])
+            if ok:
+                image_data = encoded
+        
+        return base64.b64encode(image_data).decode('ascii')
+    
+    async def _analyze_all_openai(self, image_b64: str, analysis_types: List[str]) -> Tuple[Dict[str, Any], int]:
+        """Run all requested analyses as a single multi-aspect OpenAI Vision request.
+        
+        Returns the per-type results and the total tokens used by every request made.
+        Sections of the combined request carry no tokens_used of their own, since
+        they share one call; per-type requests keep theirs.
+        """
+        if not analysis_types:
+            return {}, 0
+        
+        if len(analysis_types) == 1:
+            analysis_type = analysis_types[0]
+            result = await self._openai_analyzers[analysis_type](image_b64)
+            return {analysis_type: result}, result.get("tokens_used") or 0
+        
+        instructions = "\n".join(f"- {t}: {VISION_ANALYSES[t][2]}" for t in analysis_types)
+        prompt = (
+            "Analyze this image and respond with only a JSON object whose keys are "
+            f"{', '.join(analysis_types)}. Each value must be a string answering the "
+            f"instruction for that key.\n{instructions}"
+        )
+        
         try:
-            response = await openai_service.analyze_image_with_vision(
-                image_data,
-                prompt="Describe all objects, people, animals, and items visible in this image. Include their positions and any notable details. Format as a detailed list."
-            )
-            
-            return {
-                "objects_description": response.get("description", ""),
-                "model": response.get("model_used", "gpt-4-vision-preview"),
-                "tokens_used": response.get("tokens_used", 0)
-            }
-            
+            response = await openai_service.analyze_image_with_vision_b64(image_b64, prompt=prompt)
         except Exception as e:
-            logger.error(f"OpenAI object detection failed: {e}")
-            return {"error": str(e)}
+            logger.error(f"OpenAI combined vision analysis failed: {e}")
+            return {t: {"error": str(e)} for t in analysis_types}, 0
+        
+        tokens_used = response.get("tokens_used") or 0
+        sections = self._parse_vision_json(response.get("description") or "")
+        if sections is None or not all(t in sections for t in analysis_types):
+            # Model ignored the JSON format; fall back to one request per type
+            logger.warning("Combined vision response was not usable JSON, retrying per analysis type")
+            outputs = await asyncio.gather(*(self._openai_analyzers[t](image_b64) for t in analysis_types))
+            tokens_used += sum(output.get("tokens_used") or 0 for output in outputs)
+            return dict(zip(analysis_types, outputs)), tokens_used
+        
+        model = response.get("model_used", "gpt-4-vision-preview")
+        results = {}
+        for analysis_type in analysis_types:
+            value = sections[analysis_type]
+            results[analysis_type] = {
+                VISION_ANALYSES[analysis_type][0]: value if isinstance(value, str) else orjson.dumps(value).decode(),
+                "model": model
+            }
+        return results, tokens_used
     
-    async def _detect_faces_openai(self, image_data: bytes) -> Dict[str, Any]:
-        """Detect faces using OpenAI Vision API."""
+    @staticmethod
+    def _parse_vision_json(content: str) -> Optional[Dict[str, Any]]:
+        """Extract the JSON object from a vision response, tolerating code fences."""
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end <= start:
+            return None
         try:
-            response = await openai_service.analyze_image_with_vision(
-                image_data,
-                prompt="Count and describe all faces visible in this image. Include their positions, expressions, estimated age ranges, and any notable features. If no faces are visible, state that clearly."
-            )
-            
-            return {
-                "faces_analysis": response.get("description", ""),
-                "model": response.get("model_used", "gpt-4-vision-preview"),
-                "tokens_used": response.get("tokens_used", 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"OpenAI face detection failed: {e}")
-            return {"error": str(e)}
+            parsed = orjson.loads(content[start:end + 1])
+        except orjson.JSONDecodeError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
     
-    async def _extract_text_openai(self, image_data: bytes) -> Dict[str, Any]:
-        """Extract text using OpenAI Vision API."""
+    async def _vision_analysis(self, image_b64: str, analysis_type: str) -> Dict[str, Any]:
+        """Run a single OpenAI Vision prompt and shape the result."""
+        result_key, label, prompt = VISION_ANALYSES[analysis_type]
         try:
-            response = await openai_service.analyze_image_with_vision(
-                image_data,
-                prompt="Extract and list all text visible in this image. Include any signs, labels, handwritten text, or printed content. If no text is visible, state that clearly."
-            )
+            response = await openai_service.analyze_image_with_vision_b64(image_b64, prompt=prompt)
             
             return {
-                "extracted_text": response.get("description", ""),
+                result_key: response.get("description", ""),
                 "model": response.get("model_used", "gpt-4-vision-preview"),
                 "tokens_used": response.get("tokens_used", 0)
             }
             
         except Exception as e:
-            logger.error(f"OpenAI text extraction failed: {e}")
+            logger.error(f"OpenAI {label} failed: {e}")
             return {"error": str(e)}
     
-    async def _analyze_emotions_openai(self, image_data: bytes) -> Dict[str, Any]:
+    async def _detect_objects_openai(self, image_b64: str) -> Dict[str, Any]:
+        """Detect objects using OpenAI Vision API."""
+        return await self._vision_analysis(image_b64, 'objects')
+    
+    async def _detect_faces_openai(self, image_b64: str) -> Dict[str, Any]:
+        """Detect faces using OpenAI Vision API."""
+        return await self._vision_analysis(image_b64, 'faces')
+    
+    async def _extract_text_openai(self, image_b64: str) -> Dict[str, Any]:
+        """Extract text using OpenAI Vision API."""
+        return await self._vision_analysis(image_b64, 'text')
+    
+    async def _analyze_emotions_openai(self, image_b64: str) -> Dict[str, Any]:
         """Analyze emotions using OpenAI Vision API."""
-        try:
-            response = await openai_service.analyze_image_with_vision(
-                image_data,
-                prompt="Analyze the emotions and mood visible in this image. Look at facial expressions, body language, and overall atmosphere. Describe the emotions you can detect and their intensity."
-            )
-            
-            return {
-                "emotion_analysis": response.get("description", ""),
-                "model": response.get("model_used", "gpt-4-vision-preview"),
-                "tokens_used": response.get("tokens_used", 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"OpenAI emotion analysis failed: {e}")
-            return {"error": str(e)}
+        return await self._vision_analysis(image_b64, 'emotions')
     
-    async def _analyze_scene_openai(self, image_data: bytes) -> Dict[str, Any]:
+    async def _analyze_scene_openai(self, image_b64: str) -> Dict[str, Any]:
         """Analyze scene using OpenAI Vision API."""
-        try:
-            response = await openai_service.analyze_image_with_vision(
-                image_data,
-                prompt="Describe the overall scene, setting, and context of this image. Include location type, time of day, weather conditions, and any notable environmental factors."
-            )
-            
-            return {
-                "scene_description": response.get("description", ""),
-                "model": response.get("model_used", "gpt-4-vision-preview"),
-                "tokens_used": response.get("tokens_used", 0)
-            }
-            
-        except Exception as e:
-            logger.error(f"OpenAI scene analysis failed: {e}")
-            return {"error": str(e)}
+        return await self._vision_analysis(image_b64, 'scene')
     
     # OpenCV-based analysis methods (fallback)
-    async def _detect_objects_opencv(self, cv_image: np.ndarray) -> Dict[str, Any]:
+    def _detect_objects_opencv(self, cv_image: np.ndarray, gray: np.ndarray, original_size: Tuple[int, int]) -> Dict[str, Any]:
         """Basic object detection using OpenCV (limited capabilities)."""
         try:
             # Simple contour detection as a basic object detection
-            gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
             edges = cv2.Canny(gray, 50, 150)
             contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             
-            # Filter significant contours
-            significant_contours = [c for c in contours if cv2.contourArea(c) > 100]
+            # Filter significant contours (area threshold in original-image pixels).
+            # Enclosed contour area drops open edge fragments; connected-component
+            # or bounding-box areas would count them, so keep contourArea
+            min_area = 100 * (gray.shape[1] / original_size[0]) ** 2
+            significant_contours = [c for c in contours if cv2.contourArea(c) > min_area]
             
             return {
                 "objects_detected": len(significant_contours),
@@ -270,19 +425,34 @@ class ComputerVisionService:
             logger.error(f"OpenCV object detection failed: {e}")
             return {"error": str(e)}
     
-    async def _detect_faces_opencv(self, cv_image: np.ndarray) -> Dict[str, Any]:
+    def _detect_faces_opencv(self, cv_image: np.ndarray, gray: np.ndarray, original_size: Tuple[int, int]) -> Dict[str, Any]:
         """Detect faces using OpenCV Haar cascades."""
         try:
-            if self.face_cascade is None:
+            # Loaded on first use if initialize() hasn't preloaded it
+            face_cascade = load_cascade(FACE_CASCADE_FILE)
+            if face_cascade is None:
                 return {"error": "Face detection model not loaded"}
             
-            gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            # Factors mapping detection coordinates back to the original image
+            scale_x = original_size[0] / gray.shape[1]
+            scale_y = original_size[1] / gray.shape[0]
+            
+            scale = self._face_detection_scale(gray.shape, original_size)
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                scale_x, scale_y = scale_x / scale, scale_y / scale
+            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
             
             face_data = []
             for (x, y, w, h) in faces:
+                # Map boxes back to original image coordinates
                 face_data.append({
-                    "position": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)},
+                    "position": {
+                        "x": int(x * scale_x),
+                        "y": int(y * scale_y),
+                        "width": int(w * scale_x),
+                        "height": int(h * scale_y)
+                    },
                     "confidence": "unknown"  # Haar cascades don't provide confidence scores
                 })
             
@@ -296,7 +466,19 @@ class ComputerVisionService:
             logger.error(f"OpenCV face detection failed: {e}")
             return {"error": str(e)}
     
-    async def _extract_text_opencv(self, cv_image: np.ndarray) -> Dict[str, Any]:
+    def _face_detection_scale(self, shape: Tuple[int, int], original_size: Tuple[int, int]) -> float:
+        """Downscale factor for face search: Haar cost grows with pixel count, but
+        faces of face_min_size original pixels must still span the cascade window."""
+        if not self.face_detection_max_side:
+            return 1.0
+        
+        scale = self.face_detection_max_side / max(shape)
+        if self.face_min_size:
+            min_face = self.face_min_size * shape[1] / original_size[0]
+            scale = max(scale, HAAR_WINDOW_SIZE / min_face)
+        return min(1.0, scale)
+    
+    def _extract_text_opencv(self, cv_image: np.ndarray, gray: Optional[np.ndarray], original_size: Tuple[int, int]) -> Dict[str, Any]:
         """Extract text using OpenCV (requires additional OCR library like tesseract)."""
         try:
             # Note: This is a placeholder. For full OCR, you'd need to install pytesseract
@@ -311,28 +493,31 @@ class ComputerVisionService:
             logger.error(f"OpenCV text extraction failed: {e}")
             return {"error": str(e)}
     
-    async def _analyze_scene_opencv(self, cv_image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_emotions_opencv(self, cv_image: np.ndarray, gray: Optional[np.ndarray], original_size: Tuple[int, int]) -> Dict[str, Any]:
+        """Emotion analysis has no OpenCV fallback."""
+        return {"message": "Emotion analysis requires OpenAI"}
+    
+    def _analyze_scene_opencv(self, cv_image: np.ndarray, gray: Optional[np.ndarray], original_size: Tuple[int, int]) -> Dict[str, Any]:
         """Basic scene analysis using OpenCV."""
         try:
             # Basic image properties analysis
-            height, width, channels = cv_image.shape
-            
-            # Calculate basic color statistics
-            mean_color = np.mean(cv_image, axis=(0, 1))
+            width, height = original_size
+            channels = cv_image.shape[2]
             
-            # Brightness analysis
-            gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-            brightness = np.mean(gray)
+            # Per-channel means in one SIMD pass; brightness is the grayscale
+            # (BT.601 luma) mean, which is linear in the channel means
+            blue, green, red, _ = cv2.mean(cv_image)
+            brightness = 0.114 * blue + 0.587 * green + 0.299 * red
             
             return {
                 "image_properties": {
                     "dimensions": f"{width}x{height}",
                     "channels": channels,
-                    "brightness": float(brightness),
+                    "brightness": brightness,
                     "dominant_colors": {
-                        "blue": float(mean_color[0]),
-                        "green": float(mean_color[1]),
-                        "red": float(mean_color[2])
+                        "blue": blue,
+                        "green": green,
+                        "red": red
                     }
                 },
                 "method": "opencv_basic_analysis",
@@ -347,7 +532,7 @@ class ComputerVisionService:
         """Get computer vision service status."""
         return {
             "models_loaded": self.models_loaded,
-            "available_analysis_types": self.available_analysis_types,
+            "available_analysis_types": sorted(self.available_analysis_types),
             "max_image_size": self.max_image_size,
             "openai_available": openai_service.is_available(),
             "opencv_models": {
@@ -3,17 +3,29 @@ OpenAI service for AI interactions and language processing
 """
 import os
 import time
+import asyncio
 import logging
 import base64
-from typing import List, Dict, Any, Optional, Union
+import hashlib
+from typing import List, Dict, Any, Iterator, Optional, Union
+import httpx
+import numpy as np
+import orjson
 from openai import OpenAI, RateLimitError, APIError, APIConnectionError, APITimeoutError
 from fastapi import HTTPException, status
 
 from app.config.settings import settings
+from app.utils.cache import LRUCache, SingleFlight
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Fixed system prompt for personality analysis, built once
+PERSONALITY_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert in personality analysis. Provide detailed insights in JSON format."
+}
+
 
 class OpenAIService:
     """Enhanced service for handling OpenAI API interactions."""
@@ -34,6 +46,30 @@ class OpenAIService:
         self.tokens_per_minute = 90000
         self.last_request_time = 0
         self.min_request_interval = 1.0  # seconds between requests
+        self._rate_limit_lock = asyncio.Lock()
+        
+        # Shared by every batch analysis, so concurrent batches don't multiply the bound
+        self._batch_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_REQUESTS)
+        
+        # Cached API status snapshot, keyed on time.monotonic() expiry
+        self.status_cache_ttl = 10.0  # seconds
+        self._status_cache: Dict[str, Any] = {"expires": 0.0, "value": None}
+        
+        # Personality analyses keyed by a hash of model, prompt and text
+        self._personality_cache = LRUCache(
+            maxsize=settings.PERSONALITY_CACHE_SIZE,
+            ttl=settings.PERSONALITY_CACHE_TTL
+        )
+        
+        # Embedding vectors keyed by a hash of model and input text
+        self._embedding_cache = LRUCache(
+            maxsize=settings.EMBEDDING_CACHE_SIZE,
+            ttl=settings.EMBEDDING_CACHE_TTL
+        )
+        
+        # Identical concurrent requests (client retries, fan-out) share one upstream call
+        self._chat_flights = SingleFlight()
+        self._embedding_flights = SingleFlight()
     
     def _initialize_client(self):
         """Initialize the OpenAI client if not already done."""
@@ -45,34 +81,52 @@ class OpenAIService:
             self._initialized = True
             return
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Explicitly sized pool so concurrent requests reuse keep-alive
+        # connections instead of queueing on the library defaults; HTTP/2
+        # multiplexes concurrent calls over a single TLS connection
+        http_client = httpx.Client(
+            http2=settings.OPENAI_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+            )
+        )
+        self.client = OpenAI(api_key=self.api_key, http_client=http_client)
         self._initialized = True
     
+    def initialize(self):
+        """Create the OpenAI client and its connection pool ahead of the first request."""
+        self._initialize_client()
+    
     def is_available(self) -> bool:
         """Check if OpenAI service is available (API key is set)."""
         return bool(self.api_key and self.api_key != "test-key-for-testing")
     
-    def _rate_limit_check(self):
-        """Implement basic rate limiting."""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+    async def _rate_limit_check(self):
+        """Implement basic rate limiting without blocking the event loop."""
+        # The lock spaces out concurrent callers instead of letting them all
+        # read the same last_request_time and go at once
+        async with self._rate_limit_lock:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
+            
+            if time_since_last < self.min_request_interval:
+                sleep_time = self.min_request_interval - time_since_last
+                await asyncio.sleep(sleep_time)
+            
+            self.last_request_time = time.time()
     
-    def _handle_openai_error(self, error: Exception, attempt: int):
+    async def _handle_openai_error(self, error: Exception, attempt: int):
         """Handle OpenAI API errors with appropriate retry logic."""
         if isinstance(error, RateLimitError):
             wait_time = min(2 ** attempt, 60)  # Exponential backoff, max 60 seconds
             logger.warning(f"Rate limit hit, waiting {wait_time} seconds (attempt {attempt})")
-            time.sleep(wait_time)
+            await asyncio.sleep(wait_time)
         elif isinstance(error, (APIConnectionError, APITimeoutError)):
             wait_time = self.retry_delay * attempt
             logger.warning(f"Connection error, retrying in {wait_time} seconds (attempt {attempt})")
-            time.sleep(wait_time)
+            await asyncio.sleep(wait_time)
         elif isinstance(error, APIError):
             logger.error(f"OpenAI API error: {error}")
             raise HTTPException(
@@ -94,6 +148,20 @@ class OpenAIService:
         temperature: Optional[float] = None
     ) -> Dict[str, Any]:
         """Generate a chat completion using OpenAI."""
+        key = hashlib.sha256(orjson.dumps([model, max_tokens, temperature, messages])).digest()
+        return await self._chat_flights.run(
+            key,
+            lambda: self._generate_chat_completion(messages, model, max_tokens, temperature)
+        )
+    
+    async def _generate_chat_completion(
+        self, 
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Call the chat completions API, with rate limiting and retries."""
         
         if not self.is_available():
             raise HTTPException(
@@ -104,7 +172,7 @@ class OpenAIService:
         start_time = time.time()
         
         # Rate limiting check
-        self._rate_limit_check()
+        await self._rate_limit_check()
         
         for attempt in range(1, self.max_retries + 1):
             try:
@@ -119,7 +187,10 @@ class OpenAIService:
                 
                 logger.info(f"Generating chat completion (attempt {attempt})")
                 
-                response = self.client.chat.completions.create(
+                # Off the event loop, so concurrent requests (and their
+                # coalesced followers) keep being served meanwhile
+                response = await asyncio.to_thread(
+                    self.client.chat.completions.create,
                     model=model or self.default_model,
                     messages=messages,  # type: ignore
                     max_tokens=max_tokens or self.max_tokens,
@@ -146,7 +217,7 @@ class OpenAIService:
                 }
                 
             except (RateLimitError, APITimeoutError, APIConnectionError, APIError) as e:
-                self._handle_openai_error(e, attempt)
+                await self._handle_openai_error(e, attempt)
                 
             except Exception as e:
                 logger.error(f"Unexpected error in generate_chat_completion: {e}")
@@ -161,6 +232,57 @@ class OpenAIService:
             detail="Failed to generate response after multiple attempts. Please try again later."
         )
     
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> Iterator[Any]:
+        """Start a streamed chat completion and return the chunk iterator."""
+        
+        if not self.is_available():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="OpenAI service is not available. Please set OPENAI_API_KEY environment variable."
+            )
+        
+        # Rate limiting check
+        await self._rate_limit_check()
+        
+        try:
+            # Initialize client if needed
+            self._initialize_client()
+            
+            if self.client is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="OpenAI client not initialized"
+                )
+            
+            logger.info("Starting streamed chat completion")
+            
+            # Opening the stream waits on the upstream connection; keep that off the event loop
+            return await asyncio.to_thread(
+                self.client.chat.completions.create,
+                model=model or self.default_model,
+                messages=messages,  # type: ignore
+                max_tokens=max_tokens or self.max_tokens,
+                temperature=temperature or self.temperature,
+                presence_penalty=0.1,
+                frequency_penalty=0.1,
+                stream=True
+            )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Streamed chat completion failed: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to generate response: {str(e)}"
+            )
+    
     async def analyze_image_with_vision(
         self, 
         image_data: bytes, 
@@ -168,6 +290,19 @@ class OpenAIService:
         model: Optional[str] = None
     ) -> Dict[str, Any]:
         """Analyze an image using OpenAI Vision API."""
+        return await self.analyze_image_with_vision_b64(
+            base64.b64encode(image_data).decode('ascii'),
+            prompt=prompt,
+            model=model
+        )
+    
+    async def analyze_image_with_vision_b64(
+        self, 
+        image_base64: str, 
+        prompt: str = "Describe what you see in this image.",
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analyze an already base64-encoded image, so callers can share one encoding."""
         
         if not self.is_available():
             raise HTTPException(
@@ -185,11 +320,9 @@ class OpenAIService:
                     detail="OpenAI client not initialized"
                 )
             
-            # Convert image to base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            # Call OpenAI Vision API
-            response = self.client.chat.completions.create(
+            # Call OpenAI Vision API off the event loop so concurrent analyses overlap
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=model or self.vision_model,
                 messages=[
                     {
@@ -235,6 +368,20 @@ class OpenAIService:
                 detail="OpenAI service is not available. Please set OPENAI_API_KEY environment variable."
             )
         
+        model = model or self.default_model
+        
+        # Very short texts carry too little signal to be worth a round-trip. Count
+        # characters, not whitespace-separated words, so scripts written without
+        # spaces (Japanese, Chinese, Thai) aren't all treated as one word
+        if len(text.strip()) < settings.PERSONALITY_MIN_TEXT_CHARS:
+            logger.debug(f"Skipping personality analysis for short text ({len(text)} chars)")
+            return {"analysis": "{}", "model_used": model, "tokens_used": 0, "skipped": "text_too_short"}
+        
+        cache_key = hashlib.sha256(f"{model}\0{analysis_prompt}\0{text}".encode()).digest()
+        cached = self._personality_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Initialize client if needed
             self._initialize_client()
@@ -246,21 +393,24 @@ class OpenAIService:
                 )
             
             # Call OpenAI API for personality analysis
-            response = self.client.chat.completions.create(
-                model=model or self.default_model,
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert in personality analysis. Provide detailed insights in JSON format."},
+                    PERSONALITY_SYSTEM_MESSAGE,
                     {"role": "user", "content": f"{analysis_prompt}\n\nText to analyze: {text}"}
                 ],
                 max_tokens=1000,
                 temperature=0.3  # Lower temperature for more consistent analysis
             )
             
-            return {
+            result = {
                 "analysis": response.choices[0].message.content,
-                "model_used": model or self.default_model,
+                "model_used": model,
                 "tokens_used": response.usage.total_tokens if response.usage else None
             }
+            self._personality_cache.set(cache_key, result)
+            return result
             
         except Exception as e:
             logger.error(f"Personality analysis failed: {e}")
@@ -269,12 +419,44 @@ class OpenAIService:
                 detail=f"Personality analysis failed: {str(e)}"
             )
     
+    async def analyze_texts_for_personality(
+        self,
+        texts: List[str],
+        analysis_prompt: str,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Analyze several texts concurrently, bounded by MAX_CONCURRENT_REQUESTS across all batches."""
+        
+        if not self.is_available():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="OpenAI service is not available. Please set OPENAI_API_KEY environment variable."
+            )
+        
+        async def analyze(text: str) -> Dict[str, Any]:
+            async with self._batch_semaphore:
+                try:
+                    return await self.analyze_text_for_personality(text, analysis_prompt, model)
+                except HTTPException as e:
+                    # One failed text shouldn't discard the rest of the batch
+                    return {"error": e.detail, "model_used": model or self.default_model}
+        
+        return await asyncio.gather(*(analyze(text) for text in texts))
+    
     async def generate_text_embeddings(
         self, 
         texts: List[str],
         model: str = "text-embedding-ada-002"
     ) -> Dict[str, Any]:
-        """Generate text embeddings using OpenAI."""
+        """Generate text embeddings using OpenAI, as float32 numpy vectors."""
+        key = hashlib.sha256(orjson.dumps([model, texts])).digest()
+        return await self._embedding_flights.run(
+            key,
+            lambda: self._generate_text_embeddings(texts, model)
+        )
+    
+    async def _generate_text_embeddings(self, texts: List[str], model: str) -> Dict[str, Any]:
+        """Embed texts, serving cached vectors and sending only the misses upstream."""
         
         if not self.is_available():
             raise HTTPException(
@@ -283,25 +465,38 @@ class OpenAIService:
             )
         
         try:
-            self._initialize_client()
+            # Serve previously embedded texts from the cache; only the rest go upstream
+            cache_keys = [hashlib.sha256(f"{model}\0{text}".encode()).digest() for text in texts]
+            embeddings = [self._embedding_cache.get(key) for key in cache_keys]
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            tokens_used = 0
             
-            if self.client is None:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="OpenAI client not initialized"
+            if missing:
+                self._initialize_client()
+                
+                if self.client is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail="OpenAI client not initialized"
+                    )
+                
+                response = await asyncio.to_thread(
+                    self.client.embeddings.create,
+                    input=[texts[i] for i in missing],
+                    model=model
                 )
-            
-            response = self.client.embeddings.create(
-                input=texts,
-                model=model
-            )
-            
-            embeddings = [data.embedding for data in response.data]
+                
+                # float32 is the precision OpenAI produces; it takes an eighth of the
+                # memory of a list of Python floats and orjson serializes it natively
+                for i, data in zip(missing, response.data):
+                    embeddings[i] = np.asarray(data.embedding, dtype=np.float32)
+                    self._embedding_cache.set(cache_keys[i], embeddings[i])
+                tokens_used = response.usage.total_tokens if response.usage else None
             
             return {
                 "embeddings": embeddings,
                 "model_used": model,
-                "tokens_used": response.usage.total_tokens if response.usage else None
+                "tokens_used": tokens_used
             }
             
         except Exception as e:
@@ -328,7 +523,32 @@ class OpenAIService:
             return False
     
     def get_api_status(self) -> Dict[str, Any]:
-        """Get detailed API status information."""
+        """Get detailed API status information (cached for status_cache_ttl)."""
+        now = time.monotonic()
+        if self._status_cache["value"] is not None and now < self._status_cache["expires"]:
+            return self._status_cache["value"]
+        
+        api_status = self._fetch_api_status()
+        self._status_cache["value"] = api_status
+        self._status_cache["expires"] = now + self.status_cache_ttl
+        return api_status
+    
+    async def refresh_api_status(self, ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Fetch API status off the event loop and store it as the cached snapshot."""
+        api_status = await asyncio.to_thread(self._fetch_api_status)
+        self._status_cache["value"] = api_status
+        self._status_cache["expires"] = time.monotonic() + (ttl or self.status_cache_ttl)
+        return api_status
+    
+    async def run_status_refresher(self, interval: float):
+        """Keep the API status snapshot fresh so status reads never hit the network."""
+        while True:
+            # Snapshot outlives one missed refresh before reads fall back to fetching inline
+            await self.refresh_api_status(ttl=interval * 2)
+            await asyncio.sleep(interval)
+    
+    def _fetch_api_status(self) -> Dict[str, Any]:
+        """Build API status information from the upstream API."""
         try:
             self._initialize_client()
             if self.client is None:
@@ -341,7 +561,8 @@ class OpenAIService:
                     }
                 return {"status": "error", "message": "Client not initialized"}
             
-            # Test API connection
+            # Test API connection live; the status snapshot TTL and the background
+            # refresher already bound how often this runs
             models = self.client.models.list()
             
             return {
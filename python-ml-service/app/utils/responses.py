@@ -0,0 +1,39 @@
+"""
+Conditional JSON response helpers
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+STATUS_MAX_AGE = 10  # seconds
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a serialized response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def conditional_json_response(
+    request: Request,
+    body: bytes,
+    etag: Optional[str] = None,
+    max_age: int = STATUS_MAX_AGE
+) -> Response:
+    """Serve pre-serialized JSON with an ETag, or 304 if the client's copy is current."""
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": f"max-age={max_age}"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
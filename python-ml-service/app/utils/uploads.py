@@ -0,0 +1,43 @@
+"""
+Upload reading helpers
+"""
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+async def read_upload(file: UploadFile, max_size: int) -> bytearray:
+    """Read an uploaded file into a single buffer, rejecting oversize files before copying."""
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {max_size} bytes"
+        )
+    
+    if file.size is None:
+        # Size unknown: accumulate chunks, enforcing the limit as we go
+        buffer = bytearray()
+        while chunk := await file.read(CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                    detail=f"File size exceeds maximum allowed size of {max_size} bytes"
+                )
+        return buffer
+    
+    # Size known: read straight into a preallocated buffer, no intermediate bytes
+    buffer = bytearray(file.size)
+    view = memoryview(buffer)
+    offset = 0
+    while offset < file.size:
+        read = await run_in_threadpool(file.file.readinto, view[offset:])
+        if not read:
+            break
+        offset += read
+    view.release()
+    
+    if offset < file.size:
+        del buffer[offset:]
+    return buffer
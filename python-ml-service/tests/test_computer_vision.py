@@ -0,0 +1,150 @@
+"""
+Tests for the computer vision service and router.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Make the service package importable as `app`
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from app.services.computer_vision_service import cv_service  # noqa: E402
+
+
+def make_image(height: int, width: int, seed: int = 0, ext: str = '.png') -> bytes:
+    """Encode a smooth random image of the given size."""
+    rng = np.random.default_rng(seed)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), np.uint8), (9, 9), 0)
+    return cv2.imencode(ext, image)[1].tobytes()
+
+
+def test_concurrent_face_detection():
+    """Face analyses running in parallel worker threads must not share cascade state."""
+    images = [make_image(900 + i * 37, 1200 + i * 23, seed=i) for i in range(12)]
+
+    async def run_round():
+        cv_service._result_cache.clear()
+        return await asyncio.gather(*(
+            cv_service.analyze_image(image, ['faces'], use_openai=False) for image in images
+        ))
+
+    for _ in range(3):
+        for result in asyncio.run(run_round()):
+            assert 'error' not in result['results']['faces']
+
+
+@pytest.mark.parametrize("decode_scale", [1, 2, 4])
+def test_reduced_decode_reports_original_size(decode_scale):
+    """Reduced decodes round the size; reported dimensions come from the original."""
+    image = make_image(1001, 1503, ext='.jpg')
+    result = asyncio.run(cv_service.analyze_image(
+        image, ['scene'], use_openai=False, decode_scale=decode_scale
+    ))
+    assert result['image_info']['dimensions'] == "1503x1001"
+    assert result['results']['scene']['image_properties']['dimensions'] == "1503x1001"
+
+
+@pytest.mark.parametrize("decode_scale", [1, 2, 4])
+def test_reduced_decode_reports_exif_rotated_size(decode_scale):
+    """Sizes follow the EXIF orientation that cv2.imdecode applies, at every scale."""
+    Image = pytest.importorskip("PIL.Image")
+    import io
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise: 600x400 stored, 400x600 displayed
+    buffer = io.BytesIO()
+    Image.fromarray(np.zeros((400, 600, 3), np.uint8)).save(buffer, format="JPEG", exif=exif)
+
+    result = asyncio.run(cv_service.analyze_image(
+        buffer.getvalue(), ['scene'], use_openai=False, decode_scale=decode_scale
+    ))
+    assert result['image_info']['dimensions'] == "400x600"
+    assert result['results']['scene']['image_properties']['dimensions'] == "400x600"
+
+
+def test_analyze_endpoint_accepts_decode_scale():
+    """decode_scale arrives as a form string and must be accepted for every allowed value."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    image = make_image(200, 300, ext='.jpg')
+    with TestClient(app) as client:
+        for decode_scale in ("1", "2", "4", "8"):
+            response = client.post(
+                "/cv/analyze",
+                files={"file": ("image.jpg", image, "image/jpeg")},
+                data={"analysis_types": "scene", "use_openai": "false", "decode_scale": decode_scale}
+            )
+            assert response.status_code == 200, response.text
+            assert response.json()["image_info"]["decode_scale"] == int(decode_scale)
+
+        response = client.post(
+            "/cv/analyze",
+            files={"file": ("image.jpg", image, "image/jpeg")},
+            data={"analysis_types": "scene", "use_openai": "false", "decode_scale": "3"}
+        )
+        assert response.status_code == 400
+
+
+def test_face_search_downscale_keeps_minimum_face_detectable():
+    """Faces of CV_FACE_MIN_SIZE original pixels still span the Haar window after downscaling."""
+    from app.services.computer_vision_service import HAAR_WINDOW_SIZE
+
+    # 3000x2000 photo decoded at full size and at half size
+    for shape in ((2000, 3000), (1000, 1500)):
+        scale = cv_service._face_detection_scale(shape, (3000, 2000))
+        smallest_face = cv_service.face_min_size * shape[1] / 3000 * scale
+        assert smallest_face >= HAAR_WINDOW_SIZE - 1e-9
+
+    # Small images are never upscaled
+    assert cv_service._face_detection_scale((480, 640), (640, 480)) == 1.0
+
+
+def test_openai_analysis_skips_request_for_no_types(monkeypatch):
+    """No analysis types means no vision call; duplicates are sent once."""
+    from app.services import computer_vision_service as service_module
+
+    prompts = []
+
+    async def fake_vision(image_b64, prompt="", model=None):
+        prompts.append(prompt)
+        return {"description": '{"faces": "none", "scene": "dark"}', "model_used": "fake", "tokens_used": 1}
+
+    monkeypatch.setattr(service_module.openai_service, "is_available", lambda: True)
+    monkeypatch.setattr(service_module.openai_service, "analyze_image_with_vision_b64", fake_vision)
+    image = make_image(64, 64, seed=7)
+
+    cv_service._result_cache.clear()
+    result = asyncio.run(cv_service.analyze_image(image, [], use_openai=True))
+    assert result['results'] == {}
+    assert prompts == []
+
+    result = asyncio.run(cv_service.analyze_image(image, ['faces', 'scene', 'faces'], use_openai=True))
+    assert result['analysis_types'] == ['faces', 'scene']
+    assert len(prompts) == 1 and prompts[0].count("- faces:") == 1
+    # The combined request's usage is reported once, not per section
+    assert result['tokens_used'] == 1
+    assert all('tokens_used' not in section for section in result['results'].values())
+
+
+def test_oversize_upload_rejected_without_deprecation_warning(recwarn):
+    """Oversize uploads get a 413 using the non-deprecated status constant."""
+    from fastapi.testclient import TestClient
+    from app.config.settings import settings
+    from app.main import app
+
+    with TestClient(app) as client:
+        recwarn.clear()
+        response = client.post(
+            "/cv/analyze",
+            files={"file": ("image.jpg", b"\0" * (settings.MAX_IMAGE_SIZE + 1), "image/jpeg")},
+            data={"analysis_types": "scene", "use_openai": "false"}
+        )
+    assert response.status_code == 413
+    assert not [w for w in recwarn if "HTTP_413" in str(w.message)]
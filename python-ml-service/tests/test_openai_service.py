@@ -0,0 +1,118 @@
+"""
+Tests for the OpenAI service, run against a fake client.
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Make the service package importable as `app`
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.openai_service import OpenAIService  # noqa: E402
+
+
+class FakeCompletions:
+    """Records chat completion calls and answers with a fixed message."""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="analysis"), finish_reason="stop")],
+            usage=SimpleNamespace(total_tokens=7)
+        )
+
+
+@pytest.fixture
+def service():
+    """OpenAIService wired to a fake client, with no request spacing."""
+    service = OpenAIService()
+    service.api_key = "sk-test"
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    service._initialized = True
+    service.min_request_interval = 0
+    return service
+
+
+def test_personality_analysis_runs_for_unspaced_scripts(service):
+    """Texts without spaces are gated on length, not on a whitespace word count."""
+    text = "私は週末に友達と山に登ったり本を読んだりするのが大好きです。" * 3
+    result = asyncio.run(service.analyze_text_for_personality(text, "analyze"))
+    assert result["analysis"] == "analysis"
+    assert "skipped" not in result
+    assert len(service.client.chat.completions.calls) == 1
+
+
+def test_personality_analysis_marks_short_texts_skipped(service):
+    """Short texts return an explicit skip marker instead of a bare empty analysis."""
+    result = asyncio.run(service.analyze_text_for_personality("hi", "analyze"))
+    assert result["skipped"] == "text_too_short"
+    assert result["tokens_used"] == 0
+    assert service.client.chat.completions.calls == []
+
+
+def test_api_status_probes_upstream_on_every_refresh(service):
+    """A failing API must show up at the next status refresh, not after a model-list TTL."""
+    state = {"up": True}
+
+    def list_models():
+        if not state["up"]:
+            raise RuntimeError("connection refused")
+        return SimpleNamespace(data=[SimpleNamespace(id="gpt-4")])
+
+    service.client.models = SimpleNamespace(list=list_models)
+    assert asyncio.run(service.refresh_api_status())["status"] == "healthy"
+
+    state["up"] = False
+    assert asyncio.run(service.refresh_api_status())["status"] == "unhealthy"
+
+
+def test_rate_limit_spacing_does_not_block_event_loop(service):
+    """Back-to-back requests are spaced out with asyncio.sleep, not a blocking sleep."""
+    service.min_request_interval = 0.2
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stalls = []
+
+        async def ticker():
+            while True:
+                before = loop.time()
+                await asyncio.sleep(0.01)
+                stalls.append(loop.time() - before)
+
+        ticks = asyncio.ensure_future(ticker())
+        started = loop.time()
+        await asyncio.gather(*(
+            service.generate_chat_completion([{"role": "user", "content": f"message {i}"}])
+            for i in range(3)
+        ))
+        elapsed = loop.time() - started
+        ticks.cancel()
+        return elapsed, max(stalls)
+
+    elapsed, longest_stall = asyncio.run(run())
+    assert elapsed >= 0.4
+    assert longest_stall < 0.1
+    assert len(service.client.chat.completions.calls) == 3
+
+
+def test_batch_personality_analysis_rejects_oversized_batches():
+    """One request can't fan out more than PERSONALITY_BATCH_MAX paid analyses."""
+    from fastapi.testclient import TestClient
+    from app.config.settings import settings
+    from app.main import app
+
+    texts = ["text"] * (settings.PERSONALITY_BATCH_MAX + 1)
+    with TestClient(app) as client:
+        response = client.post(
+            "/openai/text/personality-analysis/batch",
+            json={"texts": texts, "analysis_prompt": "analyze"}
+        )
+    assert response.status_code == 422